@@ -5,84 +5,213 @@ This module provides Python classes that mirror the TypeScript models
 used in the Alpha Solve application. Use these when writing plugin functions.
 """
 
-from typing import List, Optional, Dict, Any
-from dataclasses import dataclass, asdict
+from typing import List, Optional, Dict, Any, BinaryIO, Sequence, Tuple, Union
+from dataclasses import dataclass, field
+from weakref import WeakValueDictionary
 import json
+import sys
 
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the standard library when unavailable
+    orjson = None
 
-@dataclass
+try:
+    import msgspec
+except ImportError:
+    # msgspec is optional; input is decoded through plain dictionaries without it
+    msgspec = None
+
+
+def _json_loads(json_str: str) -> Any:
+    """Parse a JSON string, using orjson when it is available"""
+    if orjson is not None:
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+
+def _json_dumps_bytes(data: Any) -> bytes:
+    """
+    Serialize data to UTF-8 encoded JSON bytes
+    See _json_dumps for how the orjson output differs from the json module
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data).encode('utf-8')
+
+
+def _write_json_bytes(data: bytes, out: Optional[BinaryIO]) -> None:
+    """Write encoded JSON to a binary stream, defaulting to stdout's underlying buffer"""
+    if out is None:
+        # Flush pending text output first so it is not reordered after the JSON
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+    out.write(data)
+
+
+def _json_dumps(data: Any) -> str:
+    """
+    Serialize data to a JSON string
+    With orjson the output uses compact separators, does not escape non-ASCII text and
+    writes NaN/Infinity as null (the json module writes NaN, which JSON.parse rejects).
+    Data orjson cannot encode, such as integers wider than 64 bits, falls back to the json module.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data).decode('utf-8')
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data)
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class Variable:
     """
     Variable class representing a named value with a type
+    `values` accepts any sequence and is stored as a tuple, so variables are fully immutable
     """
     name: str
     type: str  # 'numerical' or 'analytical'
-    values: List[str]
+    values: Sequence[str]
+
+    def __post_init__(self) -> None:
+        if type(self.values) is not tuple:
+            object.__setattr__(self, 'values', tuple(self.values))
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> 'Variable':
-        """Create a Variable from a dictionary"""
-        return Variable(
-            name=data['name'],
-            type=data['type'],
-            values=data['values']
-        )
+        """
+        Create a Variable from a dictionary
+        Equivalent variables decoded while a previous instance is still alive share that instance
+        """
+        return _intern_variable(data['name'], data['type'], data['values'])
+
+    @property
+    def is_numerical(self) -> bool:
+        """Whether this is a numerical (rather than analytical) variable"""
+        return self.type == _NUMERICAL
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert Variable to dictionary"""
-        return asdict(self)
+        return {
+            'name': self.name,
+            'type': self.type,
+            # Copied: callers own the returned dict and may modify it
+            'values': list(self.values)
+        }
 
     @staticmethod
-    def create_numerical(name: str, values: List[str]) -> 'Variable':
+    def create_numerical(name: str, values: Sequence[str]) -> 'Variable':
         """Create a numerical variable"""
-        return Variable(name=name, type='numerical', values=values)
+        return Variable(name=name, type=_NUMERICAL, values=values)
 
     @staticmethod
-    def create_analytical(name: str, values: List[str]) -> 'Variable':
+    def create_analytical(name: str, values: Sequence[str]) -> 'Variable':
         """Create an analytical variable"""
-        return Variable(name=name, type='analytical', values=values)
+        return Variable(name=name, type=_ANALYTICAL, values=values)
+
+
+# Variable types; decoded variables share these string objects instead of holding their own copies
+_NUMERICAL = 'numerical'
+_ANALYTICAL = 'analytical'
+_VARIABLE_TYPES = {_NUMERICAL: _NUMERICAL, _ANALYTICAL: _ANALYTICAL}
 
+# Variables decoded by Variable.from_dict, keyed on (name, type, values)
+_VARIABLE_CACHE: 'WeakValueDictionary[tuple, Variable]' = WeakValueDictionary()
 
-@dataclass
+
+def _intern_variable(name: str, type: str, values: Sequence[str]) -> Variable:
+    """Return the live Variable equal to the given fields, creating it if needed"""
+    type = _VARIABLE_TYPES.get(type, type)
+    values = tuple(values)
+    key = (name, type, values)
+    variable = _VARIABLE_CACHE.get(key)
+    if variable is None:
+        variable = Variable(name=name, type=type, values=values)
+        _VARIABLE_CACHE[key] = variable
+    return variable
+
+
+@dataclass(slots=True)
 class Context:
     """
     Context object containing variables
     """
     variables: List[Variable]
+    # Name -> (position, variable) of the first variable with that name. Entries are
+    # checked against `variables` on lookup, so direct edits to the list are picked up
+    _by_name: Dict[str, Tuple[int, Variable]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._reindex()
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> 'Context':
         """Create a Context from a dictionary"""
+        # The input dicts are not kept for to_dict: they may carry unknown keys and
+        # are shared with the caller, so serialization always starts from the Variables
         variables = [Variable.from_dict(v) for v in data.get('variables', [])]
         return Context(variables=variables)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert Context to dictionary"""
+        # Built fresh on every call: callers, including CellFunctionResult.to_dict,
+        # own the returned dicts and may modify them
         return {
             'variables': [v.to_dict() for v in self.variables]
         }
 
+    def _reindex(self) -> None:
+        """Rebuild the name index from the variables list"""
+        by_name: Dict[str, Tuple[int, Variable]] = {}
+        for i, var in enumerate(self.variables):
+            if var.name not in by_name:
+                by_name[var.name] = (i, var)
+        self._by_name = by_name
+
+    def _find(self, name: str) -> int:
+        """Return the position of the first variable with the given name, or -1"""
+        entry = self._by_name.get(name)
+        if entry is not None:
+            i, var = entry
+            if i < len(self.variables) and self.variables[i] is var:
+                return i
+
+        # Not indexed, or the list was edited directly since the index was built
+        for i, var in enumerate(self.variables):
+            if var.name == name:
+                self._reindex()
+                return i
+        if entry is not None:
+            self._reindex()
+        return -1
+
     def get_variable(self, name: str) -> Optional[Variable]:
         """Get a variable by name"""
-        for var in self.variables:
-            if var.name == name:
-                return var
-        return None
+        i = self._find(name)
+        return self.variables[i] if i >= 0 else None
 
     def add_variable(self, variable: Variable) -> None:
         """Add a variable to the context"""
         self.variables.append(variable)
+        if variable.name not in self._by_name:
+            self._by_name[variable.name] = (len(self.variables) - 1, variable)
 
     def remove_variable(self, name: str) -> bool:
         """Remove a variable by name"""
-        for i, var in enumerate(self.variables):
-            if var.name == name:
-                self.variables.pop(i)
-                return True
-        return False
-
-
-@dataclass
+        i = self._find(name)
+        if i < 0:
+            return False
+        del self.variables[i]
+        # Later variables have moved down one position
+        self._reindex()
+        return True
+
+@dataclass(frozen=True, slots=True)
 class DropdownSelection:
     """
     User's selection from a dropdown
@@ -106,7 +235,7 @@ class DropdownSelection:
         }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Dropdown:
     """
     Dropdown UI element that can be provided by meta functions
@@ -122,7 +251,7 @@ class Dropdown:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class CellFunctionInput:
     """
     Input structure passed to cell solution functions
@@ -130,6 +259,10 @@ class CellFunctionInput:
     cell: Dict[str, Any]
     context: Context
     dropdown_selections: Optional[List[DropdownSelection]] = None
+    # Title -> (position, selection) of the first selection with that title, built on the
+    # first get_dropdown_selection call and checked against `dropdown_selections` on lookup
+    _dropdown_index: Optional[Dict[str, Tuple[int, DropdownSelection]]] = field(default=None, init=False, repr=False, compare=False)
+    _indexed_selections: Optional[List[DropdownSelection]] = field(default=None, init=False, repr=False, compare=False)
 
     @staticmethod
     def from_dict(data: Dict[str, Any]) -> 'CellFunctionInput':
@@ -149,7 +282,16 @@ class CellFunctionInput:
     @staticmethod
     def from_json(json_str: str) -> 'CellFunctionInput':
         """Create CellFunctionInput from a JSON string"""
-        data = json.loads(json_str)
+        if msgspec is not None:
+            try:
+                wire = _CELL_FUNCTION_INPUT_DECODER.decode(json_str)
+            except msgspec.DecodeError:
+                # Unexpected shape or malformed JSON; let the dictionary path
+                # handle it so callers see the same result and errors either way
+                pass
+            else:
+                return _cell_function_input_from_wire(wire)
+        data = _json_loads(json_str)
         return CellFunctionInput.from_dict(data)
 
     def to_dict(self) -> Dict[str, Any]:
@@ -164,15 +306,38 @@ class CellFunctionInput:
 
     def get_dropdown_selection(self, title: str) -> Optional[str]:
         """Get the selected item for a dropdown by title"""
-        if not self.dropdown_selections:
+        selections = self.dropdown_selections
+        if not selections:
             return None
-        for selection in self.dropdown_selections:
+        if self._dropdown_index is None or selections is not self._indexed_selections:
+            self._index_dropdown_selections()
+
+        entry = self._dropdown_index.get(title)
+        if entry is not None:
+            i, selection = entry
+            if i < len(selections) and selections[i] is selection:
+                return selection.selected_item
+
+        # Not indexed, or the list was edited in place since the index was built
+        for selection in selections:
             if selection.title == title:
+                self._index_dropdown_selections()
                 return selection.selected_item
+        if entry is not None:
+            self._index_dropdown_selections()
         return None
 
+    def _index_dropdown_selections(self) -> None:
+        """Rebuild the title index from the dropdown selections"""
+        index: Dict[str, Tuple[int, DropdownSelection]] = {}
+        for i, selection in enumerate(self.dropdown_selections):
+            if selection.title not in index:
+                index[selection.title] = (i, selection)
+        self._dropdown_index = index
+        self._indexed_selections = self.dropdown_selections
 
-@dataclass
+
+@dataclass(slots=True)
 class CellFunctionResult:
     """
     Result returned from a cell solution function
@@ -191,10 +356,18 @@ class CellFunctionResult:
 
     def to_json(self) -> str:
         """Convert CellFunctionResult to JSON string"""
-        return json.dumps(self.to_dict())
+        return _json_dumps(self.to_dict())
+
+    def to_json_bytes(self) -> bytes:
+        """Convert CellFunctionResult to UTF-8 encoded JSON bytes"""
+        return _json_dumps_bytes(self.to_dict())
+
+    def write_json(self, out: Optional[BinaryIO] = None) -> None:
+        """Write CellFunctionResult as JSON to a binary stream (stdout by default)"""
+        _write_json_bytes(self.to_json_bytes(), out)
 
 
-@dataclass
+@dataclass(slots=True)
 class MetaFunctionResult:
     """
     Result returned from a meta function
@@ -217,10 +390,18 @@ class MetaFunctionResult:
 
     def to_json(self) -> str:
         """Convert MetaFunctionResult to JSON string"""
-        return json.dumps(self.to_dict())
+        return _json_dumps(self.to_dict())
+
+    def to_json_bytes(self) -> bytes:
+        """Convert MetaFunctionResult to UTF-8 encoded JSON bytes"""
+        return _json_dumps_bytes(self.to_dict())
+
+    def write_json(self, out: Optional[BinaryIO] = None) -> None:
+        """Write MetaFunctionResult as JSON to a binary stream (stdout by default)"""
+        _write_json_bytes(self.to_json_bytes(), out)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcMacroInput:
     """
     Input structure passed to proc macro functions
@@ -239,7 +420,16 @@ class ProcMacroInput:
     @staticmethod
     def from_json(json_str: str) -> 'ProcMacroInput':
         """Create ProcMacroInput from a JSON string"""
-        data = json.loads(json_str)
+        if msgspec is not None:
+            try:
+                wire = _PROC_MACRO_INPUT_DECODER.decode(json_str)
+            except msgspec.DecodeError:
+                # Unexpected shape or malformed JSON; let the dictionary path
+                # handle it so callers see the same result and errors either way
+                pass
+            else:
+                return ProcMacroInput(latex=wire.latex, context=_context_from_wire(wire.context))
+        data = _json_loads(json_str)
         return ProcMacroInput.from_dict(data)
 
     def to_dict(self) -> Dict[str, Any]:
@@ -250,7 +440,7 @@ class ProcMacroInput:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcMacroResult:
     """
     Result returned from a proc macro function
@@ -266,7 +456,85 @@ class ProcMacroResult:
 
     def to_json(self) -> str:
         """Convert ProcMacroResult to JSON string"""
-        return json.dumps(self.to_dict())
+        return _json_dumps(self.to_dict())
+
+    def to_json_bytes(self) -> bytes:
+        """Convert ProcMacroResult to UTF-8 encoded JSON bytes"""
+        return _json_dumps_bytes(self.to_dict())
+
+    def write_json(self, out: Optional[BinaryIO] = None) -> None:
+        """Write ProcMacroResult as JSON to a binary stream (stdout by default)"""
+        _write_json_bytes(self.to_json_bytes(), out)
+
+
+# Typed decoding
+#
+# When msgspec is available, input JSON is decoded directly into these structs,
+# skipping the intermediate dictionaries built by json.loads. They mirror the
+# payload sent by the TypeScript side (camelCase keys), and also accept the
+# snake_case keys understood by the from_dict methods. As in from_dict, a
+# camelCase key takes precedence whenever it is present, even if it is null.
+#
+# The executor does not load msgspec (or orjson) into Pyodide itself; they are
+# only used when a plugin lists them in its pythonLibraries.
+
+if msgspec is not None:
+    class _VariableWire(msgspec.Struct):
+        name: str
+        type: str
+        values: List[str]
+
+    class _ContextWire(msgspec.Struct):
+        variables: List[_VariableWire] = []
+
+    class _DropdownSelectionWire(msgspec.Struct):
+        title: str
+        selected_item: Union[Optional[str], msgspec.UnsetType] = msgspec.field(
+            default=msgspec.UNSET, name='selectedItem')
+        selected_item_snake: Optional[str] = msgspec.field(default='', name='selected_item')
+
+    class _CellFunctionInputWire(msgspec.Struct):
+        cell: Any
+        context: _ContextWire
+        dropdown_selections: Union[Optional[List[_DropdownSelectionWire]], msgspec.UnsetType] = msgspec.field(
+            default=msgspec.UNSET, name='dropdownSelections')
+        dropdown_selections_snake: Optional[List[_DropdownSelectionWire]] = msgspec.field(
+            default=None, name='dropdown_selections')
+
+    class _ProcMacroInputWire(msgspec.Struct):
+        latex: str
+        context: _ContextWire
+
+    # Decoders are created once and reused for every plugin call
+    _CELL_FUNCTION_INPUT_DECODER = msgspec.json.Decoder(_CellFunctionInputWire)
+    _PROC_MACRO_INPUT_DECODER = msgspec.json.Decoder(_ProcMacroInputWire)
+
+
+def _context_from_wire(wire: '_ContextWire') -> Context:
+    """Create a Context from its decoded wire struct"""
+    return Context(variables=[_intern_variable(v.name, v.type, v.values) for v in wire.variables])
+
+
+def _cell_function_input_from_wire(wire: '_CellFunctionInputWire') -> CellFunctionInput:
+    """Create CellFunctionInput from its decoded wire struct"""
+    dropdown_selections = None
+    selections = wire.dropdown_selections
+    if selections is msgspec.UNSET:
+        selections = wire.dropdown_selections_snake
+    if selections:
+        dropdown_selections = [
+            DropdownSelection(
+                title=s.title,
+                selected_item=s.selected_item if s.selected_item is not msgspec.UNSET else s.selected_item_snake
+            )
+            for s in selections
+        ]
+
+    return CellFunctionInput(
+        cell=wire.cell,
+        context=_context_from_wire(wire.context),
+        dropdown_selections=dropdown_selections
+    )
 
 
 # Helper functions
@@ -6,10 +6,66 @@ This module is automatically loaded when a plugin uses the 'sympy' library.
 """
 
 import re
+from functools import lru_cache
 from sympy import sympify, symbols, Eq, sqrt, sin, cos, tan, ln, log, exp, pi, E, Derivative, Integral, Symbol
 from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application
 
 
+# Transformations used for every parse_expr call in from_latex
+_TRANSFORMS = standard_transformations + (implicit_multiplication_application,)
+
+# Greek letters that are converted from LaTeX commands to plain names
+_GREEK_LETTERS = ('alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta',
+                  'iota', 'kappa', 'lambda', 'mu', 'nu', 'xi', 'omicron', 'pi', 'rho',
+                  'sigma', 'tau', 'upsilon', 'phi', 'chi', 'psi', 'omega')
+
+# LaTeX commands replaced by a single pass each
+_GREEK_TOKEN_MAP = {f'\\{letter}': letter for letter in _GREEK_LETTERS}
+_COMMAND_TOKEN_MAP = {
+    '\\cdot': '*',
+    '\\times': '*',
+    **{f'\\{func}': func for func in ('sin', 'cos', 'tan', 'ln', 'log', 'exp')},
+    '\\e': 'E',
+}
+
+# Single-character replacements applied with str.translate
+_SINGLE_CHAR_MAP = str.maketrans({'π': 'pi'})
+
+
+def _compile_token_pattern(tokens) -> 're.Pattern':
+    """
+    Compile an alternation matching any of the given LaTeX commands.
+    Longest tokens come first so that e.g. \\exp is not matched as \\e; \\e must end at a word boundary.
+    """
+    return re.compile('|'.join(
+        re.escape(token) + (r'\b' if token == '\\e' else '')
+        for token in sorted(tokens, key=len, reverse=True)
+    ))
+
+
+# Regular expressions used by the LaTeX conversion, compiled once at import time
+_RE_PRIME = re.compile(r"([a-zA-Z][a-zA-Z0-9]*)('+)")
+_RE_DEFINITE_INT = re.compile(r'\\int_\{?([^{}^]+)\}?\^\{?([^{}]+)\}?\s*(.*?)\s*d([a-zA-Z])')
+_RE_INDEFINITE_INT = re.compile(r'\\int\s+(.*?)\s*d([a-zA-Z])')
+# Definite integral, indefinite integral or primes, in the same order as the separate passes
+_RE_CALCULUS = re.compile('|'.join(p.pattern for p in (_RE_DEFINITE_INT, _RE_INDEFINITE_INT, _RE_PRIME)))
+_RE_LEFT_RIGHT = re.compile(r'\\left|\\right')
+_RE_SUBSCRIPT = re.compile(r'_\{([^{}]*)\}')
+_RE_GREEK_IMPLICIT_MUL = tuple(re.compile(rf'([a-zA-Z0-9_])({letter})') for letter in _GREEK_LETTERS)
+_RE_SQRT_IMPLICIT_MUL = re.compile(r'([a-zA-Z0-9_])sqrt\(')
+_RE_POW_BRACE = re.compile(r'\*\*\{([^{}]*)\}')
+_RE_BACKSLASH_WORD = re.compile(r'\\([a-zA-Z]+)')
+_RE_BRACE_COMMAND = re.compile(r'\\(frac|sqrt)\{')
+_RE_BRACE = re.compile(r'[{}]')
+# Anything that one of the conversion steps below would rewrite; plain input such as "x+1" has none
+_RE_NEEDS_CONVERSION = re.compile(
+    r"[\\^_{}'∫]|[a-zA-Z0-9_](?:" + '|'.join(_GREEK_LETTERS) + r"|sqrt\()"
+)
+_RE_GREEK_TOKEN = _compile_token_pattern(_GREEK_TOKEN_MAP)
+_RE_COMMAND_TOKEN = _compile_token_pattern(_COMMAND_TOKEN_MAP)
+
+
+@lru_cache(maxsize=1024)
 def from_latex(latex_str: str):
     """
     Convert a LaTeX string to a SymPy expression.
@@ -19,7 +75,7 @@ def from_latex(latex_str: str):
         latex_str: LaTeX string representing a mathematical expression
 
     Returns:
-        SymPy expression
+        SymPy expression (results are cached, which is safe because SymPy expressions are immutable)
 
     Example:
         >>> expr = from_latex(r"x^2 + 2x + 1")
@@ -38,11 +94,11 @@ def from_latex(latex_str: str):
     # Check if it's an equation (contains =)
     if '=' in expr_str:
         parts = expr_str.split('=', 1)
-        left = parse_expr(parts[0], transformations=(standard_transformations + (implicit_multiplication_application,)))
-        right = parse_expr(parts[1], transformations=(standard_transformations + (implicit_multiplication_application,)))
+        left = parse_expr(parts[0], transformations=_TRANSFORMS)
+        right = parse_expr(parts[1], transformations=_TRANSFORMS)
         return Eq(left, right)
     else:
-        return parse_expr(expr_str, transformations=(standard_transformations + (implicit_multiplication_application,)))
+        return parse_expr(expr_str, transformations=_TRANSFORMS)
 
 
 def _handle_derivatives(latex: str) -> str:
@@ -52,8 +108,6 @@ def _handle_derivatives(latex: str) -> str:
     """
     # Match variable names followed by one or more primes
     # Pattern: variable name (letters/numbers) followed by one or more '
-    pattern = r"([a-zA-Z][a-zA-Z0-9]*)('+)"
-
     def replace_prime(match):
         var_name = match.group(1)
         primes = match.group(2)
@@ -64,11 +118,11 @@ def _handle_derivatives(latex: str) -> str:
         else:
             return f"Derivative({var_name}, t, {num_primes})"
 
-    return re.sub(pattern, replace_prime, latex)
+    return _RE_PRIME.sub(replace_prime, latex)
 
 
 def _handle_integrals(latex: str) -> str:
-    """
+    r"""
     Handle integral notation in LaTeX.
     Converts:
     - \int_a^b f(x) dx -> Integral(f(x), (x, a, b))
@@ -83,7 +137,6 @@ def _handle_integrals(latex: str) -> str:
     # We'll use a simpler approach: find \int, find the d{var} at the end, extract everything
 
     # First, handle definite integrals: \int_a^b or \int_{a}^{b}
-    definite_pattern = r'\\int_\{?([^{}^]+)\}?\^\{?([^{}]+)\}?\s*(.*?)\s*d([a-zA-Z])'
 
     def replace_definite(match):
         lower = match.group(1).strip()
@@ -92,90 +145,154 @@ def _handle_integrals(latex: str) -> str:
         var = match.group(4)
         return f"Integral({integrand}, ({var}, {lower}, {upper}))"
 
-    latex = re.sub(definite_pattern, replace_definite, latex)
+    latex = _RE_DEFINITE_INT.sub(replace_definite, latex)
 
     # Then handle indefinite integrals: \int ... dx
-    indefinite_pattern = r'\\int\s+(.*?)\s*d([a-zA-Z])'
 
     def replace_indefinite(match):
         integrand = match.group(1).strip()
         var = match.group(2)
         return f"Integral({integrand}, {var})"
 
-    latex = re.sub(indefinite_pattern, replace_indefinite, latex)
+    latex = _RE_INDEFINITE_INT.sub(replace_indefinite, latex)
 
     return latex
 
 
+def _normalize_calculus(latex: str) -> str:
+    """
+    Handle integral and derivative notation in a single pass.
+    Equivalent to _handle_integrals followed by _handle_derivatives.
+    """
+    latex = latex.replace('∫', r'\int')
+
+    # With several integrals the result depends on the order of the separate passes
+    # (definite integrals first, even when nested inside an indefinite one), so keep them
+    if latex.count(r'\int') > 1:
+        return _handle_derivatives(_handle_integrals(latex))
+
+    def replace(match):
+        if match.group(4) is not None:
+            lower = _handle_derivatives(match.group(1).strip())
+            upper = _handle_derivatives(match.group(2).strip())
+            integrand = _handle_derivatives(match.group(3).strip())
+            return f"Integral({integrand}, ({match.group(4)}, {lower}, {upper}))"
+        if match.group(6) is not None:
+            integrand = _handle_derivatives(match.group(5).strip())
+            return f"Integral({integrand}, {match.group(6)})"
+
+        num_primes = len(match.group(8))
+        if num_primes == 1:
+            return f"Derivative({match.group(7)}, t)"
+        return f"Derivative({match.group(7)}, t, {num_primes})"
+
+    return _RE_CALCULUS.sub(replace, latex)
+
+
+def _find_group_end(latex: str, start: int) -> int:
+    """
+    Find the end of the brace group that opens at latex[start].
+    Returns the index just past the matching closing brace, or -1 if the braces are unbalanced.
+    """
+    depth = 0
+    # Jump between braces with the regex engine instead of stepping through every character
+    for match in _RE_BRACE.finditer(latex, start):
+        if match.group() == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return -1
+
+
+def _expand_braces(latex: str) -> str:
+    r"""
+    Convert square roots and fractions with balanced braces in a single pass.
+    \sqrt{x} -> sqrt(x), \frac{a}{b} -> ((a)/(b)), including nested commands and braces
+    """
+    out = []
+    pos = 0
+    match = _RE_BRACE_COMMAND.search(latex)
+    while match:
+        group_start = match.end() - 1
+        end = _find_group_end(latex, group_start)
+        replacement = None
+
+        if end != -1 and match.group(1) == 'sqrt':
+            replacement = f"sqrt({_expand_braces(latex[group_start + 1:end - 1])})"
+        elif end != -1 and latex.startswith('{', end):
+            den_end = _find_group_end(latex, end)
+            if den_end != -1:
+                numerator = _expand_braces(latex[group_start + 1:end - 1])
+                denominator = _expand_braces(latex[end + 1:den_end - 1])
+                replacement = f"(({numerator})/({denominator}))"
+                end = den_end
+
+        if replacement is None:
+            # No balanced argument; leave the command as it is
+            match = _RE_BRACE_COMMAND.search(latex, match.start() + 1)
+            continue
+
+        out.append(latex[pos:match.start()])
+        out.append(replacement)
+        pos = end
+        match = _RE_BRACE_COMMAND.search(latex, pos)
+
+    out.append(latex[pos:])
+    return ''.join(out)
+
+
+@lru_cache(maxsize=1024)
 def _latex_to_sympy_str(latex: str) -> str:
     """
     Convert LaTeX math notation to a SymPy-parseable string.
     """
-    # Handle integrals before other transformations
-    latex = _handle_integrals(latex)
+    # Plain expressions only need the unicode pi replaced, skip the full pipeline
+    if not _RE_NEEDS_CONVERSION.search(latex):
+        return latex.translate(_SINGLE_CHAR_MAP).strip()
 
-    # Handle derivatives (prime notation) before other transformations
-    latex = _handle_derivatives(latex)
+    # Handle integrals and derivatives (prime notation) before other transformations
+    latex = _normalize_calculus(latex)
 
     # Remove \left, \right, and other formatting commands
-    latex = re.sub(r'\\left|\\right', '', latex)
+    latex = _RE_LEFT_RIGHT.sub('', latex)
 
     # Handle subscripts with braces first: x_{11} -> x_11, v_{\alpha} -> v_\alpha
-    latex = re.sub(r'_\{([^{}]*)\}', r'_\1', latex)
+    latex = _RE_SUBSCRIPT.sub(r'_\1', latex)
 
     # Handle common Greek letters specifically (before fractions)
     # This way v_\alpha becomes v_alpha before we process fractions
-    greek_letters = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta',
-                     'iota', 'kappa', 'lambda', 'mu', 'nu', 'xi', 'omicron', 'pi', 'rho',
-                     'sigma', 'tau', 'upsilon', 'phi', 'chi', 'psi', 'omega']
-    for letter in greek_letters:
-        latex = latex.replace(f'\\{letter}', letter)
+    latex = _RE_GREEK_TOKEN.sub(lambda match: _GREEK_TOKEN_MAP[match.group(0)], latex)
 
     # Add implicit multiplication between variables/numbers and Greek letters
     # e.g., falpha -> f*alpha, 2beta -> 2*beta
-    for letter in greek_letters:
-        latex = re.sub(rf'([a-zA-Z0-9_])({letter})', rf'\1*\2', latex)
+    for pattern in _RE_GREEK_IMPLICIT_MUL:
+        latex = pattern.sub(r'\1*\2', latex)
 
-    # Replace square roots BEFORE fractions: \sqrt{x} -> sqrt(x)
-    # This way \sqrt{2} becomes sqrt(2) before we process fractions
-    latex = re.sub(r'\\sqrt\{([^{}]*)\}', r'sqrt(\1)', latex)
+    # Replace square roots and fractions: \sqrt{x} -> sqrt(x), \frac{a}{b} -> ((a)/(b))
+    # Nested commands are expanded from the inside out in the same pass
+    latex = _expand_braces(latex)
 
     # Add implicit multiplication between variables/numbers and sqrt
     # e.g., asqrt(2) -> a*sqrt(2), 2sqrt(3) -> 2*sqrt(3)
-    latex = re.sub(r'([a-zA-Z0-9_])sqrt\(', r'\1*sqrt(', latex)
-
-    # Replace fractions: \frac{a}{b} -> (a)/(b)
-    # Now that subscripts, Greek letters, and square roots are simplified, this will work
-    # Limit iterations to prevent infinite loops
-    for _ in range(100):
-        if r'\frac' not in latex:
-            break
-        latex = re.sub(r'\\frac\{([^{}]*)\}\{([^{}]*)\}', r'((\1)/(\2))', latex)
+    latex = _RE_SQRT_IMPLICIT_MUL.sub(r'\1*sqrt(', latex)
 
     # Replace exponents: ^ -> **
     latex = latex.replace('^', '**')
 
     # Handle exponents with braces: x**{2} -> x**2
-    latex = re.sub(r'\*\*\{([^{}]*)\}', r'**(\1)', latex)
-
-    # Handle \cdot as multiplication
-    latex = latex.replace(r'\cdot', '*')
-    latex = latex.replace(r'\times', '*')
+    latex = _RE_POW_BRACE.sub(r'**(\1)', latex)
 
-    # Handle common functions
-    latex = re.sub(r'\\sin', 'sin', latex)
-    latex = re.sub(r'\\cos', 'cos', latex)
-    latex = re.sub(r'\\tan', 'tan', latex)
-    latex = re.sub(r'\\ln', 'ln', latex)
-    latex = re.sub(r'\\log', 'log', latex)
-    latex = re.sub(r'\\exp', 'exp', latex)
+    # Handle \cdot and \times as multiplication, common functions and \e in one pass
+    # This runs after implicit multiplication so that e.g. \exp\sin does not turn into ex*psin
+    latex = _RE_COMMAND_TOKEN.sub(lambda match: _COMMAND_TOKEN_MAP[match.group(0)], latex)
 
     # Handle constants (pi was already handled with Greek letters)
-    latex = latex.replace('π', 'pi')
-    latex = re.sub(r'\\e\b', 'E', latex)
+    latex = latex.translate(_SINGLE_CHAR_MAP)
 
     # Remove remaining backslashes for any other cases
-    latex = re.sub(r'\\([a-zA-Z]+)', r'\1', latex)
+    latex = _RE_BACKSLASH_WORD.sub(r'\1', latex)
 
     # Clean up spaces
     latex = latex.strip()
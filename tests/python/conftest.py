@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The plugin helpers are served as plain files to Pyodide rather than installed as a package
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'public' / 'python'))
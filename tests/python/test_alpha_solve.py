@@ -0,0 +1,253 @@
+import json
+
+import pytest
+
+import alpha_solve
+from alpha_solve import CellFunctionInput, CellFunctionResult, Context, DropdownSelection, ProcMacroInput, Variable
+
+
+def test_get_variable():
+    x = Variable.create_numerical('x', ['1'])
+    y = Variable.create_analytical('y', ['a'])
+    ctx = Context(variables=[x, y])
+    assert ctx.get_variable('x') is x
+    assert ctx.get_variable('y') is y
+    assert ctx.get_variable('z') is None
+
+
+def test_get_variable_after_item_replacement():
+    x = Variable.create_numerical('x', ['1'])
+    z = Variable.create_numerical('z', ['3'])
+    ctx = Context(variables=[x])
+    assert ctx.get_variable('x') is x
+    ctx.variables[0] = z
+    assert ctx.get_variable('x') is None
+    assert ctx.get_variable('z') is z
+
+
+def test_get_variable_after_reassignment_with_same_length():
+    ctx = Context(variables=[Variable.create_numerical('x', ['1'])])
+    assert ctx.get_variable('x') is not None
+    z = Variable.create_numerical('z', ['3'])
+    w = Variable.create_numerical('w', ['4'])
+    ctx.variables = [z, w]
+    assert ctx.get_variable('x') is None
+    assert ctx.get_variable('z') is z
+    assert ctx.get_variable('w') is w
+
+
+def test_direct_list_edits_are_visible():
+    x = Variable.create_numerical('x', ['1'])
+    y = Variable.create_numerical('y', ['2'])
+    ctx = Context(variables=[x])
+    ctx.get_variable('x')
+    ctx.variables.append(y)
+    assert ctx.get_variable('y') is y
+    del ctx.variables[0]
+    assert ctx.get_variable('x') is None
+    assert ctx.get_variable('y') is y
+
+
+def test_variables_stays_a_list():
+    x = Variable.create_numerical('x', ['1'])
+    y = Variable.create_numerical('y', ['2'])
+    ctx = Context(variables=[x])
+    ctx.add_variable(y)
+    assert ctx.variables == [x, y]
+    extended = Context(variables=ctx.variables + [Variable.create_numerical('z', ['3'])])
+    assert extended.get_variable('z') is not None
+
+
+def test_first_variable_with_a_name_wins():
+    first = Variable.create_numerical('x', ['1'])
+    second = Variable.create_numerical('x', ['2'])
+    ctx = Context(variables=[Variable.create_numerical('a', ['0']), first, second])
+    assert ctx.get_variable('x') is first
+    # Shifting positions must not make the index return the later duplicate
+    del ctx.variables[0]
+    assert ctx.get_variable('x') is first
+
+
+def test_remove_variable():
+    x = Variable.create_numerical('x', ['1'])
+    y = Variable.create_numerical('y', ['2'])
+    ctx = Context(variables=[x, y])
+    assert ctx.remove_variable('x')
+    assert ctx.variables == [y]
+    assert ctx.get_variable('x') is None
+    assert ctx.get_variable('y') is y
+    assert not ctx.remove_variable('x')
+
+
+def test_remove_variable_with_duplicate_names():
+    first = Variable.create_numerical('x', ['1'])
+    second = Variable.create_numerical('x', ['2'])
+    ctx = Context(variables=[first, second])
+    assert ctx.remove_variable('x')
+    assert ctx.variables == [second]
+    assert ctx.get_variable('x') is second
+    assert ctx.remove_variable('x')
+    assert ctx.variables == []
+    assert not ctx.remove_variable('x')
+
+
+def test_remove_variable_after_direct_replacement():
+    ctx = Context(variables=[Variable.create_numerical('x', ['1'])])
+    ctx.get_variable('x')
+    ctx.variables[0] = Variable.create_numerical('z', ['3'])
+    assert not ctx.remove_variable('x')
+    assert ctx.remove_variable('z')
+    assert ctx.variables == []
+
+
+def test_add_variable_updates_index():
+    ctx = Context(variables=[])
+    x = Variable.create_numerical('x', ['1'])
+    ctx.add_variable(x)
+    assert ctx.get_variable('x') is x
+    ctx.add_variable(Variable.create_numerical('x', ['2']))
+    assert ctx.get_variable('x') is x
+
+
+@pytest.mark.parametrize('data', [
+    {'big': 2 ** 70},
+    {'negative': -2 ** 64},
+    {'text': 'π', 'values': ['1', '2']},
+])
+def test_json_dumps_round_trips(data):
+    assert json.loads(alpha_solve._json_dumps(data)) == data
+    assert json.loads(alpha_solve._json_dumps_bytes(data)) == data
+
+
+def test_json_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(alpha_solve, 'orjson', None)
+    data = {'big': 2 ** 70}
+    assert json.loads(alpha_solve._json_dumps(data)) == data
+    assert json.loads(alpha_solve._json_dumps_bytes(data)) == data
+
+
+def test_variable_values_are_stored_as_a_tuple():
+    values = ['1', '2']
+    var = Variable.create_numerical('x', values)
+    values.append('3')
+    assert var.values == ('1', '2')
+    assert var.to_dict() == {'name': 'x', 'type': 'numerical', 'values': ['1', '2']}
+
+
+def test_from_dict_interns_equal_variables():
+    data = {'name': 'x', 'type': 'numerical', 'values': ['1', '2']}
+    var = Variable.from_dict(data)
+    assert Variable.from_dict(dict(data)) is var
+    assert Variable.from_dict({'name': 'x', 'type': 'numerical', 'values': ['1']}) is not var
+
+
+def test_interned_variables_cannot_be_modified():
+    data = {'name': 'x', 'type': 'numerical', 'values': ['1', '2']}
+    var = Variable.from_dict(data)
+    data['values'].append('3')
+    assert var.values == ('1', '2')
+    with pytest.raises(AttributeError):
+        var.values.append('3')
+    with pytest.raises(AttributeError):
+        var.values = ['3']
+    assert Variable.from_dict({'name': 'x', 'type': 'numerical', 'values': ['1', '2']}) is var
+
+
+CELL_INPUTS = [
+    {'cell': {}, 'context': {'variables': []}},
+    {'cell': {'latex': 'x'}, 'context': {'variables': [{'name': 'x', 'type': 'numerical', 'values': ['1']}]}},
+    {'cell': {}, 'context': {}, 'dropdownSelections': [{'title': 't', 'selectedItem': 'v'}]},
+    {'cell': {}, 'context': {}, 'dropdownSelections': None, 'dropdown_selections': [{'title': 't', 'selected_item': 'v'}]},
+    {'cell': {}, 'context': {}, 'dropdown_selections': [{'title': 't', 'selected_item': 'v'}]},
+    {'cell': {}, 'context': {}, 'dropdownSelections': [{'title': 't', 'selectedItem': None, 'selected_item': 'v'}]},
+    {'cell': {}, 'context': {}, 'dropdownSelections': [{'title': 't', 'selected_item': None}]},
+    {'cell': {}, 'context': {}, 'dropdownSelections': [{'title': 't'}]},
+    {'cell': {}, 'context': {}, 'dropdownSelections': []},
+    {'cell': {}, 'context': {'variables': [{'name': 'x', 'type': 'numerical', 'values': [1]}]}},
+]
+
+
+@pytest.mark.parametrize('data', CELL_INPUTS)
+def test_cell_function_input_from_json_matches_from_dict(data):
+    assert CellFunctionInput.from_json(json.dumps(data)) == CellFunctionInput.from_dict(data)
+
+
+@pytest.mark.parametrize('data', CELL_INPUTS[:5])
+def test_cell_function_input_from_json_without_msgspec(monkeypatch, data):
+    monkeypatch.setattr(alpha_solve, 'msgspec', None)
+    assert CellFunctionInput.from_json(json.dumps(data)) == CellFunctionInput.from_dict(data)
+
+
+def test_proc_macro_input_from_json_matches_from_dict():
+    data = {'latex': r'\int x dx', 'context': {'variables': [{'name': 'x', 'type': 'analytical', 'values': ['a']}]}}
+    assert ProcMacroInput.from_json(json.dumps(data)) == ProcMacroInput.from_dict(data)
+
+
+@pytest.mark.parametrize('text', ['{', '[1,', ''])
+def test_from_json_raises_json_decode_error(text):
+    with pytest.raises(json.JSONDecodeError):
+        CellFunctionInput.from_json(text)
+    with pytest.raises(json.JSONDecodeError):
+        ProcMacroInput.from_json(text)
+
+
+def _cell_input(selections):
+    return CellFunctionInput(cell={}, context=Context(variables=[]), dropdown_selections=selections)
+
+
+def test_get_dropdown_selection():
+    cell_input = _cell_input([DropdownSelection('a', '1'), DropdownSelection('a', '2'), DropdownSelection('b', '3')])
+    assert cell_input.get_dropdown_selection('a') == '1'
+    assert cell_input.get_dropdown_selection('b') == '3'
+    assert cell_input.get_dropdown_selection('c') is None
+    assert _cell_input(None).get_dropdown_selection('a') is None
+
+
+def test_dropdown_index_after_in_place_edits():
+    selections = [DropdownSelection('a', '1'), DropdownSelection('b', '2')]
+    cell_input = _cell_input(selections)
+    assert cell_input.get_dropdown_selection('a') == '1'
+    selections[0] = DropdownSelection('a', 'changed')
+    assert cell_input.get_dropdown_selection('a') == 'changed'
+    selections[1] = DropdownSelection('c', '3')
+    assert cell_input.get_dropdown_selection('b') is None
+    assert cell_input.get_dropdown_selection('c') == '3'
+    selections.append(DropdownSelection('d', '4'))
+    assert cell_input.get_dropdown_selection('d') == '4'
+
+
+def test_dropdown_index_after_reassignment():
+    cell_input = _cell_input([DropdownSelection('a', '1'), DropdownSelection('b', '2')])
+    assert cell_input.get_dropdown_selection('a') == '1'
+    selections = [DropdownSelection('a', '9'), DropdownSelection('c', '3')]
+    cell_input.dropdown_selections = selections
+    assert cell_input.get_dropdown_selection('a') == '9'
+    assert cell_input.get_dropdown_selection('b') is None
+    # Reading a selection leaves the field as the caller set it
+    assert cell_input.dropdown_selections is selections
+    cell_input.dropdown_selections = None
+    assert cell_input.get_dropdown_selection('a') is None
+
+
+def test_to_dict_output_does_not_alias_the_context():
+    data = {'variables': [{'name': 'x', 'type': 'numerical', 'values': ['1']}]}
+    ctx = Context.from_dict(data)
+    result = ctx.to_dict()
+    result['variables'][0]['values'].append('HACK')
+    result['variables'][0]['name'] = 'zz'
+    result['variables'].append({'name': 'junk'})
+    assert ctx.to_dict() == data
+    assert ctx.get_variable('x').values == ('1',)
+
+    result = CellFunctionResult(new_context=ctx).to_dict()
+    result['new_context']['variables'][0]['values'].append('HACK')
+    assert CellFunctionResult(new_context=ctx).to_dict()['new_context'] == data
+
+
+def test_to_dict_follows_context_changes():
+    ctx = Context(variables=[Variable.create_numerical('x', ['1'])])
+    ctx.to_dict()
+    ctx.add_variable(Variable.create_analytical('y', ['a']))
+    assert [v['name'] for v in ctx.to_dict()['variables']] == ['x', 'y']
+    ctx.variables[0] = Variable.create_numerical('z', ['3'])
+    assert [v['name'] for v in ctx.to_dict()['variables']] == ['z', 'y']
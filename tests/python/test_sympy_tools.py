@@ -0,0 +1,108 @@
+import re
+
+import pytest
+
+sympy = pytest.importorskip('sympy')
+
+import sympy_tools
+from sympy_tools import (
+    _expand_braces, _handle_derivatives, _handle_integrals, _latex_to_sympy_str, _normalize_calculus, from_latex
+)
+
+
+@pytest.mark.parametrize('latex', [
+    r"f'(x)",
+    r"g''(t)+h'(u)",
+    r"\int x dx",
+    r"\int x^2 + 1 dx",
+    r"\int_{0}^{1} x^2 dx",
+    r"\int_0^1 f'(x) dx",
+    r"\int_{a}^{b} h'(u) du",
+    r"\int_{0}^{\infty} e^{-x} dx",
+    r"g''(t)+\int_{a}^{b} h'(u) du",
+    r"\int x dx + \int y dy",
+    r"\int \int x dx dy",
+    r"∫ x dx",
+    r"x+1",
+    r"",
+])
+def test_normalize_calculus_matches_sequential_passes(latex):
+    expected = _handle_derivatives(_handle_integrals(latex.replace('∫', r'\int')))
+    assert _normalize_calculus(latex) == expected
+
+
+@pytest.mark.parametrize('latex, expected', [
+    (r'\frac{a}{b}', '((a)/(b))'),
+    (r'\frac{\frac{1}{2}}{3}', '((((1)/(2)))/(3))'),
+    (r'\sqrt{x+1}', 'sqrt(x+1)'),
+    (r'\sqrt{\frac{a}{b}}', 'sqrt(((a)/(b)))'),
+    (r'\frac{x^{2}}{y}', '((x^{2})/(y))'),
+    (r'x+\frac{1}{\sqrt{2}}', 'x+((1)/(sqrt(2)))'),
+    (r'2\sqrt{x}', '2sqrt(x)'),
+    (r'x^{2}', 'x^{2}'),
+])
+def test_expand_braces(latex, expected):
+    assert _expand_braces(latex) == expected
+
+
+@pytest.mark.parametrize('latex', [r'\frac{a}{b', r'\frac{a}', r'\sqrt{', r'\sqrt{x'])
+def test_expand_braces_leaves_unbalanced_input(latex):
+    assert _expand_braces(latex) == latex
+
+
+@pytest.mark.parametrize('latex, expected', [
+    (r'\frac{1}{2}', sympy.Rational(1, 2)),
+    (r'\sqrt{4}', sympy.Integer(2)),
+    (r'2\cdot3', sympy.Integer(6)),
+    (r'\sin(\pi)', sympy.Integer(0)),
+    (r'\int_{0}^{1} x dx', sympy.Integral(sympy.Symbol('x'), (sympy.Symbol('x'), 0, 1))),
+])
+def test_from_latex(latex, expected):
+    assert from_latex(latex) == expected
+
+
+@pytest.mark.parametrize('latex, expected', [
+    (r'\e', 'E'),
+    (r'2\e', '2E'),
+    (r'\sin(\e)', 'sin(E)'),
+    (r'\e\sin(x)', 'Esin(x)'),
+    (r'\exp(x)', 'exp(x)'),
+    (r'\eta', 'eta'),
+])
+def test_e_token(latex, expected):
+    assert _latex_to_sympy_str(latex) == expected
+
+
+@pytest.mark.parametrize('latex', [r'\epsilon', r'\exp(x)', r'\eta'])
+def test_longer_commands_are_not_split_at_e(latex):
+    assert 'E' not in _latex_to_sympy_str(latex)
+    assert _latex_to_sympy_str(latex + r'+\e').endswith('+E')
+
+
+@pytest.mark.parametrize('latex', [
+    'x+1',
+    '2π',
+    'π',
+    'beta',
+    '2beta',
+    'xalpha',
+    'alphabet',
+    'asqrt(2)',
+    'sqrt(2)',
+    'x = 3',
+    '  y  ',
+    'sin(x)*exp(x)',
+    'e',
+    'pi',
+    'cdot',
+    '3.5/x',
+    '',
+    r'x^2',
+    r'\alpha',
+    r'x_{1}',
+])
+def test_fast_path_matches_full_pipeline(monkeypatch, latex):
+    fast = _latex_to_sympy_str.__wrapped__(latex)
+    # An empty pattern matches every input, forcing the full pipeline
+    monkeypatch.setattr(sympy_tools, '_RE_NEEDS_CONVERSION', re.compile(''))
+    assert _latex_to_sympy_str.__wrapped__(latex) == fast